@@ -6,11 +6,9 @@ def main():
     print("Input devices:")
     for i in range(pa.get_device_count()):
         info = pa.get_device_info_by_index(i)
-        if int(info.get("maxInputChannels", 0)) > 0:
-            name = info.get("name", "?")
-            ch = int(info.get("maxInputChannels", 0))
-            rate = int(info.get("defaultSampleRate", 0))
-            print(f"[{i}] {name} — {ch} ch @ {rate} Hz")
+        ch = info["maxInputChannels"]
+        if ch > 0:
+            print(f"[{i}] {info['name']} — {ch} ch @ {info['defaultSampleRate']:.0f} Hz")
     pa.terminate()
 
 
@@ -0,0 +1,102 @@
+import random
+import struct
+
+import opuslib
+
+OPUS_GRANULE_RATE = 48000  # Ogg Opus granule positions always count 48 kHz samples
+FRAME_MS = 20
+
+
+def _crc_table() -> list[int]:
+    table = []
+    for byte in range(256):
+        crc = byte << 24
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x04C11DB7) if crc & 0x80000000 else (crc << 1)
+        table.append(crc & 0xFFFFFFFF)
+    return table
+
+
+_CRC_TABLE = _crc_table()
+
+
+def _ogg_crc(data: bytes) -> int:
+    crc = 0
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ _CRC_TABLE[((crc >> 24) ^ byte) & 0xFF]
+    return crc
+
+
+class OggOpusEncoder:
+    """Encode 16-bit PCM into an Ogg Opus byte stream (RFC 7845), chunk by chunk.
+
+    PCM is cut into 20 ms Opus frames; the output of each encode() call holds
+    the frames completed so far as Ogg pages, preceded on the first call by the
+    OpusHead and OpusTags header pages.
+    """
+
+    def __init__(self, rate: int = 16000, channels: int = 1):
+        self.rate = rate
+        self.channels = channels
+        self._encoder = opuslib.Encoder(rate, channels, opuslib.APPLICATION_VOIP)
+        self._frame_samples = rate * FRAME_MS // 1000
+        self._frame_bytes = self._frame_samples * channels * 2
+        self._granule_step = OPUS_GRANULE_RATE * FRAME_MS // 1000
+        self._pending = bytearray()
+
+        self._serial = random.getrandbits(32)
+        self._sequence = 0
+        self._granule = 0
+
+        pre_skip = self._encoder.lookahead * (OPUS_GRANULE_RATE // rate)
+        head = struct.pack("<8sBBHIhB", b"OpusHead", 1, channels, pre_skip, rate, 0, 0)
+        vendor = b"stream_google_stt"
+        tags = b"OpusTags" + struct.pack("<I", len(vendor)) + vendor + struct.pack("<I", 0)
+        self._headers = self._page([head], granule=0, header_type=0x02) + self._page([tags], granule=0)
+
+    def _page(self, packets: list[bytes], granule: int, header_type: int = 0) -> bytes:
+        lacing = bytearray()
+        for packet in packets:
+            lacing += b"\xff" * (len(packet) // 255)
+            lacing.append(len(packet) % 255)
+        header = struct.pack(
+            "<4sBBqIIIB",
+            b"OggS",
+            0,
+            header_type,
+            granule,
+            self._serial,
+            self._sequence,
+            0,
+            len(lacing),
+        )
+        page = bytearray(header + lacing + b"".join(packets))
+        struct.pack_into("<I", page, 22, _ogg_crc(page))
+        self._sequence += 1
+        return bytes(page)
+
+    def encode(self, pcm: bytes) -> bytes:
+        """Consume PCM and return the Ogg data for every whole frame so far"""
+        self._pending += pcm
+        out = []
+        if self._headers:
+            out.append(self._headers)
+            self._headers = b""
+
+        packets = []
+        segments = 0
+        while len(self._pending) >= self._frame_bytes:
+            frame = bytes(self._pending[:self._frame_bytes])
+            del self._pending[:self._frame_bytes]
+            packet = self._encoder.encode(frame, self._frame_samples)
+            packet_segments = len(packet) // 255 + 1
+            # An Ogg page holds at most 255 lacing values
+            if segments + packet_segments > 255:
+                out.append(self._page(packets, self._granule))
+                packets, segments = [], 0
+            packets.append(packet)
+            segments += packet_segments
+            self._granule += self._granule_step
+        if packets:
+            out.append(self._page(packets, self._granule))
+        return b"".join(out)
@@ -0,0 +1,49 @@
+from math import ceil, gcd
+
+import numpy as np
+from scipy.signal import firwin, resample_poly
+
+
+class StreamResampler:
+    """Polyphase resampler for interleaved 16-bit PCM arriving in chunks.
+
+    Filter history is carried between calls so chunk boundaries stay seamless;
+    the price is a fixed look-ahead of a few milliseconds of input.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int, channels: int = 1):
+        factor = gcd(in_rate, out_rate)
+        self.up = out_rate // factor
+        self.down = in_rate // factor
+        self.channels = channels
+
+        # Same Kaiser low-pass resample_poly designs by default, computed once
+        max_rate = max(self.up, self.down)
+        half_len = 10 * max_rate
+        self._taps = firwin(2 * half_len + 1, 1.0 / max_rate, window=("kaiser", 5.0))
+
+        # Input samples of context needed on each side of the emitted block,
+        # rounded up to whole resampling periods so output phase never drifts
+        self._context = self.down * ceil((half_len / self.up + 1) / self.down)
+        self._pending = np.zeros((self._context, channels), dtype=np.float64)
+
+    def process(self, data) -> bytes:
+        """Resample a chunk of interleaved int16 PCM, returning int16 PCM bytes"""
+        frames = np.frombuffer(data, dtype=np.int16).reshape(-1, self.channels)
+        self._pending = np.concatenate((self._pending, frames))
+
+        context = self._context
+        usable = (len(self._pending) - 2 * context) // self.down * self.down
+        if usable <= 0:
+            return b""
+
+        segment = self._pending[:usable + 2 * context]
+        resampled = resample_poly(segment, self.up, self.down, axis=0, window=self._taps)
+        start = context * self.up // self.down
+        out = resampled[start:start + usable * self.up // self.down]
+        self._pending = self._pending[usable:]
+
+        # Round and clip in place: one int16 conversion is the only extra copy
+        np.rint(out, out=out)
+        np.clip(out, -32768, 32767, out=out)
+        return out.astype(np.int16).tobytes()
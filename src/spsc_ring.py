@@ -0,0 +1,74 @@
+class SPSCRing:
+    """Fixed-size single-producer/single-consumer ring over one contiguous slab.
+
+    Slot ``i`` occupies ``slab[i * slot_size:(i + 1) * slot_size]``, so chunks
+    that arrive back to back sit next to each other and can be read out with a
+    single copy. Only the producer advances ``_head`` and only the consumer
+    advances ``_tail``, so neither side needs a lock.
+
+    The ring never blocks the producer: when the consumer falls a full ring
+    behind, new chunks overwrite the oldest ones, so whatever is read next is
+    always the most recent ``slots`` chunks.
+    """
+
+    def __init__(self, slot_size: int, slots: int = 32):
+        self._size = slots
+        self._slot_size = slot_size
+        self._slab = memoryview(bytearray(slot_size * slots))
+        self._lengths = [0] * slots
+        self._head = 0
+        self._tail = 0
+        self.dropped = 0  # chunks lost: overwritten before being read, or oversized
+
+    def __len__(self) -> int:
+        return min(self._head - self._tail, self._size)
+
+    def push(self, data: bytes) -> None:
+        """Store a chunk (producer side only), overwriting the oldest if full"""
+        size = len(data)
+        if size > self._slot_size:
+            self.dropped += 1
+            return
+        index = self._head % self._size
+        offset = index * self._slot_size
+        self._slab[offset:offset + size] = data
+        self._lengths[index] = size
+        # Publish last, so every slot below _head is fully written
+        self._head += 1
+
+    def pop(self) -> bytes:
+        """Remove and return every queued chunk as one bytes object
+
+        Adjacent slots are sliced out of the slab as a single view, so the
+        result is assembled with one allocation and one copy.
+        """
+        head = self._head
+        tail = self._tail
+        if head - tail > self._size:
+            # Overrun: the slots before head - size were already overwritten
+            self.dropped += head - self._size - tail
+            tail = head - self._size
+
+        lengths = []
+        segments = []
+        start = end = None
+        for position in range(tail, head):
+            index = position % self._size
+            offset = index * self._slot_size
+            if offset != end:
+                if start is not None:
+                    segments.append(self._slab[start:end])
+                start = offset
+            lengths.append(self._lengths[index])
+            end = offset + lengths[-1]
+        if start is not None:
+            segments.append(self._slab[start:end])
+        data = b"".join(segments)
+
+        # The producer may have lapped the oldest slots while they were copied
+        torn = min(self._head - self._size - tail, len(lengths))
+        if torn > 0:
+            self.dropped += torn
+            data = data[sum(lengths[:torn]):]
+        self._tail = head
+        return data
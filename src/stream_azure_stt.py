@@ -1,35 +1,104 @@
 import argparse
+import atexit
 import os
 import queue
+import re
+import signal
 import sys
+from collections import OrderedDict
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Dict, Iterable, Optional, Tuple
+from xml.sax.saxutils import escape as xml_escape, quoteattr
 import locale
 import unicodedata
-import time
 import threading
 
 import pyaudio
 import azure.cognitiveservices.speech as speechsdk
 
+from resampling import StreamResampler
+
 from openai import AzureOpenAI, OpenAI
 
 WELCOME_PROMPT = "ආයුබෝවන්, සම්පත් බැංකුවට ඔබව සාදරයෙන්  පිළිගන්නෙමු. මම ඔබට සහය දැක්වීමට සිටින, සම්පත් බැංකුවේම කෘතිම බුද්ධි නියෝජිතයාය....මම අද කෙසේද ඔබට  සහාය වන්නේ?"
 FAREWELL_DISPLAY = "🛑 පරිශීලකයා විසින් නතර කරන ලදී\n👋 සම්පත් බැංකුව හා එක් වූවාට ඔබට ස්තූතියි සුභ දවසක්!"
 FAREWELL_TTS = "සම්පත් බැංකුව හා එක් වූවාට ඔබට ස්තූතියි..... සුභ දවසක්!!"
 
+# Enhanced system prompt for natural Sinhala conversation
+SYSTEM_PROMPT = """ඔබ සිංහල භාෂාවෙන් කතා කරන බුද්ධිමත් සහායකයෙකි. 
+        ඔබේ ගුණාංග:
+        - සිංහල සංස්කෘතිය සහ භාෂාව ගැඹුරින් දන්නවා
+        - ස්වභාවික, මිත්‍රශීලී සිංහල භාෂාවෙන් කතා කරනවා  
+        - කෙටි, ප්‍රයෝජනවත් පිළිතුරු දෙනවා
+        - ප්‍රශ්නවලට නිවැරදි සහ උපකාරී පිළිතුරු දෙනවා
+        - සිංහල වචන සහ ප්‍රකාශන නිවැරදිව භාවිතා කරනවා"""
+_BASE_MESSAGES = [{"role": "system", "content": SYSTEM_PROMPT}]
+
+STT_SAMPLE_RATE = 16000  # highest rate pushed to Azure from custom input devices
+
 TTS_SAMPLE_RATE = 16000
 TTS_CHANNELS = 1
 TTS_SAMPLE_WIDTH = 2  # bytes per sample for 16-bit PCM
 TTS_CHUNK_DURATION = 0.1  # seconds
 TTS_CHUNK_BYTES = int(TTS_SAMPLE_RATE * TTS_CHANNELS * TTS_SAMPLE_WIDTH * TTS_CHUNK_DURATION)
+TTS_OUTPUT_FRAMES = 256  # small PortAudio output buffer for quick first audio
 
 stop_tts_event = threading.Event()
 
+# Recently answered utterances: normalized text -> (AI reply, TTS PCM)
+RESPONSE_CACHE_SIZE = 64
+_response_cache: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+
+# Utterances that never reach OpenAI (and so are never cached either)
+AI_MIN_TOKENS = 2
+AI_SKIP_PHRASES = {
+    "හ්ම්", "ඔව්", "නැහැ", "okay", "ok",
+    "හ්ම් හ්ම්", "ඔව් ඔව්", "හරි හරි", "ඔව් හරි", "ok ok", "okay okay",
+}
+_SKIP_PUNCTUATION_TABLE = str.maketrans("", "", ".,!?。")
+
 # Set UTF-8 encoding for proper Sinhala character display
 sys.stdout.reconfigure(encoding='utf-8', errors='replace')
 sys.stderr.reconfigure(encoding='utf-8', errors='replace')
 
+# Console output from the recognizer/TTS path is written by a dedicated thread
+# so Azure SDK callbacks never block on terminal I/O
+_log_q: "queue.Queue[str]" = queue.Queue()
+
+
+def _console_writer() -> None:
+    while True:
+        parts = [_log_q.get()]
+        # Write everything queued so far with a single flush
+        while True:
+            try:
+                parts.append(_log_q.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            sys.stdout.write("".join(parts))
+            sys.stdout.flush()
+        except (OSError, ValueError):
+            # Broken pipe, closed terminal or closed stdout: drop the text but
+            # keep draining so _flush_log() never waits on a dead thread
+            pass
+        finally:
+            for _ in parts:
+                _log_q.task_done()
+
+
+def _log(text: str) -> None:
+    """Queue raw text (include the trailing newline) for the console writer"""
+    _log_q.put(text)
+
+
+def _flush_log() -> None:
+    """Block until everything queued with _log() has reached stdout"""
+    _log_q.join()
+
+
+threading.Thread(target=_console_writer, name="console-writer", daemon=True).start()
+
 # Set locale for proper Unicode handling
 try:
     # Try Sinhala locale first
@@ -50,15 +119,22 @@ except:
             pass  # Use system default
 
 # Load environment variables from .env file if it exists
+_ENV_LINE_RE = re.compile(
+    r"""^[ \t]*(?:export[ \t]+)?([A-Za-z_][A-Za-z0-9_]*)[ \t]*=[ \t]*"""
+    r"""(?:"([^"\n]*)"|'([^'\n]*)'|([^\n]*?))[ \t]*\r?$""",
+    re.MULTILINE,
+)
+
+
 def load_env_file():
+    """Load KEY=value pairs from .env without overriding variables already set"""
     env_file = Path(__file__).parent.parent / '.env'
     if env_file.exists():
-        with open(env_file, encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    key, value = line.split('=', 1)
-                    os.environ[key.strip()] = value.strip()
+        data = env_file.read_text(encoding='utf-8')
+        for match in _ENV_LINE_RE.finditer(data):
+            key, double_quoted, single_quoted, bare = match.groups()
+            value = next(v for v in (double_quoted, single_quoted, bare) if v is not None)
+            os.environ.setdefault(key, value)
 
 load_env_file()
 
@@ -66,7 +142,7 @@ load_env_file()
 openai_client = None
 model_name = None
 enable_ai_responses = False
-_last_interim_display = ""
+_last_interim_width = 0  # display width of the interim line currently on screen
 
 try:
     # Use official OpenAI API (much more reliable!)
@@ -95,48 +171,54 @@ except Exception as e:
     print("🔄 AI responses අක්‍රිය කරමින්...")
     enable_ai_responses = False
 
+# Zero-width characters that can cause display issues (ZWNJ, ZWJ, BOM)
+_ZERO_WIDTH_TABLE = str.maketrans('', '', '\u200c\u200d\ufeff')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
 def normalize_sinhala_text(text):
     """Normalize Sinhala text to fix common character encoding issues"""
     if not text:
         return text
-    
-    # Normalize Unicode characters (NFC is standard for Sinhala)
-    normalized = unicodedata.normalize('NFC', text)
-    
-    # Remove problematic zero-width characters that can cause display issues
-    normalized = normalized.replace('\u200c', '')  # Remove ZWNJ
-    normalized = normalized.replace('\u200d', '')  # Remove ZWJ
-    normalized = normalized.replace('\ufeff', '')  # Remove BOM
-    
-    # Ensure proper Sinhala character combinations
-    # Fix common spacing issues
-    normalized = ' '.join(normalized.split())  # Normalize whitespace
-    
-    return normalized
+
+    # NFC is standard for Sinhala; then drop ZWNJ/ZWJ/BOM and collapse whitespace
+    normalized = unicodedata.normalize('NFC', text).translate(_ZERO_WIDTH_TABLE)
+    return _WHITESPACE_RE.sub(' ', normalized).strip()
 
 def get_sinhala_response(prompt: str) -> str:
     """Generate intelligent Sinhala response using OpenAI"""
     if not openai_client or not enable_ai_responses:
         return ""
     
+    # Only show the "thinking" indicator when the reply is not almost instant.
+    # The lock orders the timer against the reply, so the indicator is either
+    # shown (and later cleared) or never shown at all.
+    indicator_lock = threading.Lock()
+    indicator_shown = False
+    reply_done = False
+
+    def show_thinking():
+        nonlocal indicator_shown
+        with indicator_lock:
+            if not reply_done:
+                indicator_shown = True
+                _log("🤔 AI සිතමින්...")
+
+    def finish_thinking():
+        nonlocal reply_done
+        thinking.cancel()
+        with indicator_lock:
+            reply_done = True
+            return indicator_shown
+
+    thinking = threading.Timer(0.3, show_thinking)
+    thinking.daemon = True
+    thinking.start()
+
     try:
-        print("🤔 AI සිතමින්...", end="", flush=True)
-        
-        # Enhanced system prompt for natural Sinhala conversation
-        system_prompt = """ඔබ සිංහල භාෂාවෙන් කතා කරන බුද්ධිමත් සහායකයෙකි. 
-        ඔබේ ගුණාංග:
-        - සිංහල සංස්කෘතිය සහ භාෂාව ගැඹුරින් දන්නවා
-        - ස්වභාවික, මිත්‍රශීලී සිංහල භාෂාවෙන් කතා කරනවා  
-        - කෙටි, ප්‍රයෝජනවත් පිළිතුරු දෙනවා
-        - ප්‍රශ්නවලට නිවැරදි සහ උපකාරී පිළිතුරු දෙනවා
-        - සිංහල වචන සහ ප්‍රකාශන නිවැරදිව භාවිතා කරනවා"""
-        
         response = openai_client.chat.completions.create(
             model=model_name,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ],
+            messages=_BASE_MESSAGES + [{"role": "user", "content": prompt}],
             max_tokens=200,
             temperature=0.7,
             top_p=0.9,
@@ -145,39 +227,62 @@ def get_sinhala_response(prompt: str) -> str:
         )
         
         # Clear the "thinking" indicator
-        print("\r" + " " * 20 + "\r", end="", flush=True)
+        if finish_thinking():
+            _log("\r" + " " * 20 + "\r")
         
         ai_response = response.choices[0].message.content.strip()
         return ai_response
         
     except Exception as e:
-        print(f"\r❌ AI දෝෂයක්: {str(e)}")
+        finish_thinking()
+        _log(f"\r❌ AI දෝෂයක්: {str(e)}\n")
         return ""
 
+def _should_skip_ai(text: str) -> bool:
+    """True for filler or too-short utterances not worth an OpenAI round-trip"""
+    words = text.translate(_SKIP_PUNCTUATION_TABLE).lower().split()
+    return len(words) < AI_MIN_TOKENS or " ".join(words) in AI_SKIP_PHRASES
+
+
+def _response_cache_get(text: str) -> Optional[Tuple[str, bytes]]:
+    """Return the cached (reply, TTS audio) for a normalized utterance"""
+    entry = _response_cache.get(text)
+    if entry is not None:
+        _response_cache.move_to_end(text)
+    return entry
+
+
+def _response_cache_put(text: str, reply: str, tts_audio: bytes) -> None:
+    """Remember a reply and its audio, evicting the least recently used entry"""
+    _response_cache[text] = (reply, tts_audio)
+    _response_cache.move_to_end(text)
+    if len(_response_cache) > RESPONSE_CACHE_SIZE:
+        _response_cache.popitem(last=False)
+
+
+# Deletion table for the Sinhala Unicode block (U+0D80–U+0DFF)
+_SINHALA_STRIP = {codepoint: None for codepoint in range(0x0D80, 0x0E00)}
+
+
 def get_display_width(text):
     """Calculate display width accounting for Sinhala characters"""
-    width = 0
-    for char in text:
-        if ord(char) >= 0x0D80 and ord(char) <= 0x0DFF:  # Sinhala Unicode range
-            width += 2  # Sinhala characters often take more space
-        else:
-            width += 1
-    return width
+    # Sinhala characters often take more space, so count them twice
+    sinhala_chars = len(text) - len(text.translate(_SINHALA_STRIP))
+    return len(text) + sinhala_chars
 
 
 def _clear_interim_line():
     """Clear the previously printed interim line from stdout"""
-    global _last_interim_display
-    if not _last_interim_display:
+    global _last_interim_width
+    if not _last_interim_width:
         return
-    sys.stdout.write("\r" + " " * get_display_width(_last_interim_display) + "\r")
-    sys.stdout.flush()
-    _last_interim_display = ""
+    _log("\r" + " " * _last_interim_width + "\r")
+    _last_interim_width = 0
 
 
 def on_recognizing(evt: speechsdk.SpeechRecognitionEventArgs, show_lang: bool = True) -> None:
     """Handle interim recognition events"""
-    global _last_interim_display
+    global _last_interim_width
     text = normalize_sinhala_text(evt.result.text)
     if not text:
         return
@@ -189,9 +294,10 @@ def on_recognizing(evt: speechsdk.SpeechRecognitionEventArgs, show_lang: bool =
         prefix = f"[{evt.result.language}] "
 
     display = f"📝 {prefix}{text}"
-    sys.stdout.write("\r" + display)
-    sys.stdout.flush()
-    _last_interim_display = display
+    width = get_display_width(display)
+    # Pad over any tail left behind when the new interim is shorter
+    _log("\r" + display + " " * max(0, _last_interim_width - width))
+    _last_interim_width = width
 
 
 def on_recognized(evt: speechsdk.SpeechRecognitionEventArgs, show_lang: bool = True) -> None:
@@ -201,7 +307,7 @@ def on_recognized(evt: speechsdk.SpeechRecognitionEventArgs, show_lang: bool = T
     if evt.result.reason != speechsdk.ResultReason.RecognizedSpeech:
         if evt.result.reason == speechsdk.ResultReason.NoMatch:
             _clear_interim_line()
-            print("🤷‍♀️ වාක්‍යය හඳුනාගත නොහැකිවුණි.")
+            _log("🤷‍♀️ වාක්‍යය හඳුනාගත නොහැකිවුණි.\n")
         return
 
     text = normalize_sinhala_text(evt.result.text)
@@ -214,46 +320,143 @@ def on_recognized(evt: speechsdk.SpeechRecognitionEventArgs, show_lang: bool = T
     if show_lang and getattr(evt.result, "language", None):
         prefix = f"[{evt.result.language}] "
 
-    print(f"✅ {prefix}{text}")
+    _log(f"✅ {prefix}{text}\n")
 
     if enable_ai_responses:
+        if _should_skip_ai(text):
+            return
+
+        cached = _response_cache_get(text)
+        if cached:
+            ai_reply, tts_audio = cached
+            _log(f"🤖 {ai_reply}\n")
+            if enable_tts and tts_audio:
+                stop_tts_event.set()
+                play_tts_audio(tts_audio)
+            return
+
         ai_reply = get_sinhala_response(text)
         if ai_reply:
-            print(f"🤖 {ai_reply}")
-            speak_sinhala_text(ai_reply)
+            _log(f"🤖 {ai_reply}\n")
+            tts_audio = speak_sinhala_text(ai_reply)
+            # Empty audio means barge-in or a TTS failure; caching it would
+            # replay this reply silently until it is evicted
+            if tts_audio or not enable_tts:
+                _response_cache_put(text, ai_reply, tts_audio)
 
 
 def on_canceled(evt: speechsdk.SpeechRecognitionCanceledEventArgs) -> None:
     """Handle cancellation events from the recognizer"""
     _clear_interim_line()
-    print("❌ Azure Speech සේවය නතර විය.")
+    _log("❌ Azure Speech සේවය නතර විය.\n")
     if evt.reason:
-        print(f"   ↳ හේතුව: {evt.reason}")
-    result = getattr(evt, "result", None)
-    details = getattr(result, "cancellation_details", None)
-    if details:
-        if getattr(details, "error_code", None):
-            print(f"   ↳ දෝෂ කේතය: {details.error_code}")
-        if getattr(details, "error_details", None):
-            print(f"   ↳ විස්තර: {details.error_details}")
+        _log(f"   ↳ හේතුව: {evt.reason}\n")
+    try:
+        details = evt.result.cancellation_details
+        if details.error_code:
+            _log(f"   ↳ දෝෂ කේතය: {details.error_code}\n")
+        if details.error_details:
+            _log(f"   ↳ විස්තර: {details.error_details}\n")
+    except AttributeError:
+        pass
+
+
+# One PortAudio instance for the whole process: initializing PortAudio probes
+# every host API and device, which is slow, so it is done at most once.
+_PA_SINGLETON: Optional[pyaudio.PyAudio] = None
+_pa_lock = threading.Lock()
+
+
+def _get_pa() -> pyaudio.PyAudio:
+    """Return the shared PyAudio instance, creating it on first use"""
+    global _PA_SINGLETON
+    with _pa_lock:
+        if _PA_SINGLETON is None:
+            _PA_SINGLETON = pyaudio.PyAudio()
+        return _PA_SINGLETON
+
+
+def _terminate_pa() -> None:
+    if _PA_SINGLETON is not None:
+        _PA_SINGLETON.terminate()
+
+
+atexit.register(_terminate_pa)
 
 
 def list_devices(pa: pyaudio.PyAudio) -> None:
     for i in range(pa.get_device_count()):
         info = pa.get_device_info_by_index(i)
-        if int(info.get("maxInputChannels", 0)) > 0:
-            print(f"[{i}] {info['name']} - {int(info['maxInputChannels'])} ch @ {int(info.get('defaultSampleRate', 0))} Hz")
+        channels = info["maxInputChannels"]
+        if channels > 0:
+            print(f"[{i}] {info['name']} - {channels} ch @ {info['defaultSampleRate']:.0f} Hz")
+
+
+MAX_BURST_CHUNKS = 16  # callback chunks coalesced into one MicrophoneStream yield
+
+
+class _ByteRing:
+    """Single-producer/single-consumer byte ring over a preallocated buffer.
+
+    The PortAudio callback is the only writer of ``_head`` and the consumer the
+    only writer of ``_tail``, so neither side ever takes a lock.
+    """
+
+    def __init__(self, capacity: int):
+        self._capacity = capacity
+        self._view = memoryview(bytearray(capacity))
+        self._head = 0  # total bytes written
+        self._tail = 0  # total bytes read
+
+    @property
+    def read_available(self) -> int:
+        return self._head - self._tail
+
+    def push(self, data) -> bool:
+        """Copy ``data`` into the ring; drop it (return False) if it does not fit"""
+        size = len(data)
+        if size > self._capacity - (self._head - self._tail):
+            return False
+        src = memoryview(data)
+        start = self._head % self._capacity
+        first = min(size, self._capacity - start)
+        self._view[start:start + first] = src[:first]
+        if first < size:
+            self._view[:size - first] = src[first:]
+        self._head += size
+        return True
+
+    def pop_into(self, buf: bytearray) -> int:
+        """Move up to ``len(buf)`` bytes into ``buf`` and return the count"""
+        size = min(len(buf), self._head - self._tail)
+        start = self._tail % self._capacity
+        first = min(size, self._capacity - start)
+        buf[:first] = self._view[start:start + first]
+        if first < size:
+            buf[first:size] = self._view[:size - first]
+        self._tail += size
+        return size
 
 
 class MicrophoneStream:
+    """Callback-driven microphone capture yielding coalesced PCM bytes.
+
+    stream_transcribe does not use this class; custom devices push to Azure
+    straight from their own PortAudio callback.
+    """
+
     def __init__(self, rate: int, chunk: int, device_index: Optional[int] = None, channels: int = 1):
         self.rate = rate
         self.chunk = chunk
         self.channels = channels
         self.device_index = device_index
-        self._audio_interface = pyaudio.PyAudio()
-        self._buff: "queue.Queue[bytes]" = queue.Queue()
-        self._closed = True
+        self._audio_interface = _get_pa()
+        # ~4 seconds of 16-bit audio; the ring coalesces bursts on its own
+        self._buff = _ByteRing(rate * channels * 2 * 4)
+        # Preallocated write target for each yield, sized for a whole burst
+        self._scratch = bytearray(chunk * channels * 2 * MAX_BURST_CHUNKS)
+        self._closed = threading.Event()
+        self._closed.set()
 
     def __enter__(self):
         kwargs = dict(
@@ -267,7 +470,7 @@ class MicrophoneStream:
         if self.device_index is not None:
             kwargs["input_device_index"] = self.device_index
         self._stream = self._audio_interface.open(**kwargs)
-        self._closed = False
+        self._closed.clear()
         return self
 
     def __exit__(self, exc_type, exc, traceback):
@@ -275,35 +478,36 @@ class MicrophoneStream:
             self._stream.stop_stream()
             self._stream.close()
         finally:
-            self._closed = True
-            self._buff.put(None)
-            self._audio_interface.terminate()
+            self._closed.set()
 
     def _fill_buffer(self, in_data, frame_count, time_info, status_flags):
-        self._buff.put(in_data)
+        self._buff.push(in_data)
         return None, pyaudio.paContinue
 
     def generator(self) -> Iterable[bytes]:
-        while not self._closed:
-            chunk = self._buff.get()
-            if chunk is None:
-                return
-            data = [chunk]
-            while True:
-                try:
-                    chunk = self._buff.get(block=False)
-                    if chunk is None:
-                        return
-                    data.append(chunk)
-                except queue.Empty:
-                    break
-            yield b"".join(data)
+        """Yield everything captured since the last yield, up to one burst"""
+        poll_interval = self.chunk / self.rate / 2
+        while not self._closed.is_set():
+            if not self._buff.read_available:
+                self._closed.wait(poll_interval)
+                continue
+            size = self._buff.pop_into(self._scratch)
+            yield bytes(memoryview(self._scratch)[:size])
 
 
 # Initialize TTS
 speech_synthesizer = None
 enable_tts = False
 
+TTS_VOICE = os.getenv('AZURE_TTS_VOICE', 'si-LK-ThiliniNeural')
+_SSML_TEMPLATE = (
+    '<speak version="1.0" xmlns="http://www.w3.org/2001/10/synthesis" xml:lang="si-LK">'
+    f'<voice name={quoteattr(TTS_VOICE)}>'
+    '<prosody rate="medium" pitch="medium">{}</prosody>'
+    '</voice>'
+    '</speak>'
+)
+
 try:
     if os.getenv('AZURE_SPEECH_KEY') and os.getenv('AZURE_SPEECH_REGION'):
         # Configure speech synthesis
@@ -318,8 +522,7 @@ try:
         )
 
         # Set Sinhala voice
-        voice_name = os.getenv('AZURE_TTS_VOICE', 'si-LK-ThiliniNeural')
-        speech_config.speech_synthesis_voice_name = voice_name
+        speech_config.speech_synthesis_voice_name = TTS_VOICE
 
         # Disable default speaker output; we stream the bytes manually
         speech_synthesizer = speechsdk.SpeechSynthesizer(
@@ -330,12 +533,53 @@ try:
         enable_tts = os.getenv('ENABLE_TTS', 'false').lower() == 'true'
 
         if enable_tts:
-            print(f"🔊 සිංහල TTS සක්‍රිය: {voice_name}")
+            print(f"🔊 සිංහල TTS සක්‍රිය: {TTS_VOICE}")
         
 except Exception as e:
     print(f"⚠️ TTS setup දෝෂයක්: {str(e)}")
     enable_tts = False
 
+# Recognizers keyed by (key, region, languages, push-stream channels or None
+# for the default microphone, push-stream rate), each with its push stream
+# when it has one
+_recognizers: Dict[tuple, tuple] = {}
+
+
+def _get_recognizer(key, region, lang_codes, channels, sample_rate=STT_SAMPLE_RATE):
+    """Return a (recognizer, push stream, cache key) for this configuration
+
+    Pass ``channels=None`` to capture from the default microphone instead of a
+    push stream at ``sample_rate``. Recognizers are built once and reused on
+    later calls.
+    """
+    cache_key = (key, region, lang_codes, channels, sample_rate)
+    cached = _recognizers.get(cache_key)
+    if cached:
+        return (*cached, cache_key)
+
+    speech_config = speechsdk.SpeechConfig(subscription=key, region=region)
+    speech_config.speech_recognition_language = lang_codes
+
+    audio_stream = None
+    if channels is not None:
+        audio_format = speechsdk.audio.AudioStreamFormat(
+            samples_per_second=sample_rate,
+            bits_per_sample=16,
+            channels=channels,
+        )
+        audio_stream = speechsdk.audio.PushAudioInputStream(stream_format=audio_format)
+        audio_config = speechsdk.audio.AudioConfig(stream=audio_stream)
+    else:
+        audio_config = speechsdk.audio.AudioConfig(use_default_microphone=True)
+
+    speech_recognizer = speechsdk.SpeechRecognizer(
+        speech_config=speech_config,
+        audio_config=audio_config,
+    )
+    _recognizers[cache_key] = (speech_recognizer, audio_stream)
+    return speech_recognizer, audio_stream, cache_key
+
+
 def stream_transcribe(
     key,
     region,
@@ -358,7 +602,7 @@ def stream_transcribe(
     if enable_ai_responses:
         print(f"🧠 AI මොඩලය: {model_name}")
     if enable_tts:
-        print(f"🎵 TTS හඬ: {os.getenv('AZURE_TTS_VOICE', 'si-LK-ThiliniNeural')}")
+        print(f"🎵 TTS හඬ: {TTS_VOICE}")
     print("=" * 60)
     print("📢 සිංහලෙන් කතා කරන්න...")
     print("🎧 AI පිළිතුරු ශ්‍රවණය කරන්න...")
@@ -369,10 +613,9 @@ def stream_transcribe(
     selected_device = device_id
     device_name = None
     auto_selected = False
-    pa = None
 
     try:
-        pa = pyaudio.PyAudio()
+        pa = _get_pa()
         if selected_device is None:
             for idx in range(pa.get_device_count()):
                 info = pa.get_device_info_by_index(idx)
@@ -386,9 +629,6 @@ def stream_transcribe(
             device_name = info.get("name")
     except Exception as lookup_err:
         print(f"⚠️ මයික් භාවිත සඳහා උපකරණ පරීක්ෂණ දෝෂයක්: {lookup_err}")
-    finally:
-        if pa:
-            pa.terminate()
 
     if selected_device is not None and device_name:
         if auto_selected:
@@ -402,151 +642,119 @@ def stream_transcribe(
     print(f"📣 {greeting_text}")
     speak_sinhala_text(greeting_text, force=True)
 
-    # Configure speech recognition
-    speech_key = key
-    service_region = region
-
-    speech_config = speechsdk.SpeechConfig(subscription=speech_key, region=service_region)
-    speech_config.speech_recognition_language = lang_codes
+    # Azure's Sinhala model runs at 16 kHz: faster capture is resampled down
+    # locally, slower capture is pushed as-is rather than upsampled
+    push_rate = min(rate, STT_SAMPLE_RATE)
+
+    # Configure speech recognition (reused across calls with the same setup)
+    speech_recognizer, audio_stream, recognizer_key = _get_recognizer(
+        key,
+        region,
+        lang_codes,
+        channels if selected_device is not None else None,
+        push_rate,
+    )
 
-    audio_stream = None
-    audio_thread = None
+    mic_stream = None
     audio_stop_event = threading.Event()
+    mic_errors = []  # filled by the PortAudio callback, reported by the main thread
 
     if selected_device is not None:
         chunk_size = max(320, int(rate / 10))
-        audio_format = speechsdk.audio.AudioStreamFormat(
-            samples_per_second=rate,
-            bits_per_sample=16,
-            channels=channels,
-        )
-        audio_stream = speechsdk.audio.PushAudioInputStream(stream_format=audio_format)
-        audio_config = speechsdk.audio.AudioConfig(stream=audio_stream)
-
-        def feed_device_audio():
-            stream = None
-            pa_local = pyaudio.PyAudio()
+        resampler = None
+        if rate > push_rate:
+            resampler = StreamResampler(rate, push_rate, channels)
+            _log(f"🎚️ {rate} Hz → {push_rate} Hz ලෙස යළි සැකසේ\n")
+
+        def push_device_audio(in_data, frame_count, time_info, status_flags):
+            # PushAudioInputStream.write copies into the SDK's own buffer, so it is
+            # safe to call straight from the PortAudio callback without a thread hop
+            if audio_stop_event.is_set():
+                return None, pyaudio.paComplete
             try:
-                stream = pa_local.open(
-                    format=pyaudio.paInt16,
-                    channels=channels,
-                    rate=rate,
-                    input=True,
-                    frames_per_buffer=chunk_size,
-                    input_device_index=selected_device,
-                )
-                while not audio_stop_event.is_set():
-                    data = stream.read(chunk_size, exception_on_overflow=False)
-                    if not data:
-                        continue
-                    try:
-                        audio_stream.write(data)
-                    except Exception:
-                        break
-            except Exception as mic_err:
-                print(f"❌ මයික් දෝෂයක්: {mic_err}")
-            finally:
+                if resampler:
+                    in_data = resampler.process(in_data)
+                if in_data:
+                    audio_stream.write(in_data)
+            except Exception as err:
+                mic_errors.append(err)
                 audio_stop_event.set()
-                if stream:
-                    try:
-                        stream.stop_stream()
-                        stream.close()
-                    except Exception:
-                        pass
-                pa_local.terminate()
-                try:
-                    audio_stream.close()
-                except Exception:
-                    pass
-
-        audio_thread = threading.Thread(target=feed_device_audio, daemon=True)
-        audio_thread.start()
-    else:
-        audio_config = speechsdk.audio.AudioConfig(use_default_microphone=True)
+                return None, pyaudio.paComplete
+            return None, pyaudio.paContinue
 
-    speech_recognizer = speechsdk.SpeechRecognizer(
-        speech_config=speech_config,
-        audio_config=audio_config,
-    )
+        try:
+            mic_stream = _get_pa().open(
+                format=pyaudio.paInt16,
+                channels=channels,
+                rate=rate,
+                input=True,
+                frames_per_buffer=chunk_size,
+                input_device_index=selected_device,
+                stream_callback=push_device_audio,
+            )
+        except Exception as mic_err:
+            _log(f"❌ මයික් දෝෂයක්: {mic_err}\n")
+            audio_stop_event.set()
+            # A closed push stream cannot be reused, so drop it from the cache
+            _recognizers.pop(recognizer_key, None)
+            try:
+                audio_stream.close()
+            except Exception:
+                pass
 
+    # Drop handlers left over from a previous session on a reused recognizer
+    for event_signal in (speech_recognizer.recognizing, speech_recognizer.recognized, speech_recognizer.canceled):
+        event_signal.disconnect_all()
     speech_recognizer.recognizing.connect(lambda evt: on_recognizing(evt, show_lang))
     speech_recognizer.recognized.connect(lambda evt: on_recognized(evt, show_lang))
     speech_recognizer.canceled.connect(on_canceled)
 
     speech_recognizer.start_continuous_recognition()
 
-    interrupted = False
+    # Block until Ctrl+C. The timeout matters: lock waits are not interruptible
+    # on Windows, and a signal that lands on an SDK or PortAudio thread only
+    # runs the Python handler once the main thread wakes up
+    stop_requested = threading.Event()
+    previous_sigint = signal.signal(signal.SIGINT, lambda signum, frame: stop_requested.set())
 
     try:
-        while True:
-            time.sleep(0.1)
-    except KeyboardInterrupt:
-        interrupted = True
+        while not stop_requested.wait(0.5):
+            while mic_errors:
+                _log(f"❌ මයික් දෝෂයක්: {mic_errors.pop()}\n")
     finally:
+        signal.signal(signal.SIGINT, previous_sigint)
         audio_stop_event.set()
-        speech_recognizer.stop_continuous_recognition()
-        if audio_stream:
+        if mic_stream:
             try:
-                audio_stream.close()
+                mic_stream.stop_stream()
+                mic_stream.close()
             except Exception:
                 pass
-        if audio_thread and audio_thread.is_alive():
-            audio_thread.join(timeout=1.0)
-
-    if interrupted:
-        raise KeyboardInterrupt
+        # Leave the push stream open so the next session can reuse this recognizer
+        speech_recognizer.stop_continuous_recognition()
 
-def speak_sinhala_text(text: str, *, force: bool = False):
-    """Speak Sinhala text using Azure TTS with barge-in support"""
-    if ((not enable_tts) and not force) or not speech_synthesizer or not text.strip():
-        return
+    raise KeyboardInterrupt
 
+def _play_pcm_chunks(chunks: Iterable[bytes]) -> bool:
+    """Play 16 kHz mono PCM chunks as they arrive; False if interrupted or failed"""
     try:
-        # Stop any active playback before starting a new utterance
-        stop_tts_event.set()
-
-        clean_text = normalize_sinhala_text(text)
-        if not clean_text:
-            return
-
-        ssml = f"""
-        <speak version="1.0" xmlns="http://www.w3.org/2001/10/synthesis" xml:lang="si-LK">
-            <voice name="{os.getenv('AZURE_TTS_VOICE', 'si-LK-ThiliniNeural')}">
-                <prosody rate="medium" pitch="medium">
-                    {clean_text}
-                </prosody>
-            </voice>
-        </speak>
-        """
-
-        result = speech_synthesizer.speak_ssml_async(ssml).get()
-        if result.reason != speechsdk.ResultReason.SynthesizingAudioCompleted:
-            print(f"❌ TTS දෝෂයක්: {result.reason}")
-            return
-
-        audio_data = result.audio_data or b""
-        if not audio_data:
-            print("❌ TTS දෝෂයක්: හිස් ශ්‍රව්‍ය දත්ත")
-            return
-
         stop_tts_event.clear()
-        print("🔊 කථනය කරමින්...", end="", flush=True)
+        _log("🔊 කථනය කරමින්...")
 
-        p = pyaudio.PyAudio()
         stream = None
         try:
-            stream = p.open(
+            stream = _get_pa().open(
                 format=pyaudio.paInt16,
                 channels=TTS_CHANNELS,
                 rate=TTS_SAMPLE_RATE,
                 output=True,
+                frames_per_buffer=TTS_OUTPUT_FRAMES,
             )
 
-            chunk_size = max(TTS_CHUNK_BYTES, 320)
-            for offset in range(0, len(audio_data), chunk_size):
+            for chunk in chunks:
                 if stop_tts_event.is_set():
                     break
-                stream.write(audio_data[offset:offset + chunk_size])
+                stream.write(chunk)
         finally:
             if stream:
                 try:
@@ -554,18 +762,90 @@ def speak_sinhala_text(text: str, *, force: bool = False):
                     stream.close()
                 except Exception:
                     pass
-            p.terminate()
 
         # Clear the speaking indicator line
-        print("\r" + " " * 30 + "\r", end="", flush=True)
+        _log("\r" + " " * 30 + "\r")
 
         if stop_tts_event.is_set():
-            print("🛑 TTS නතර විය", flush=True)
-        else:
-            print("🎵 කථනය සම්පූර්ණයි", flush=True)
+            _log("🛑 TTS නතර විය\n")
+            return False
+        _log("🎵 කථනය සම්පූර්ණයි\n")
+        return True
+
+    except Exception as e:
+        _log(f"\r❌ කථන දෝෂයක්: {str(e)}\n")
+        return False
+
+
+def play_tts_audio(audio_data: bytes) -> None:
+    """Play already-synthesized 16 kHz mono PCM, stopping early on barge-in"""
+    chunk_size = max(TTS_CHUNK_BYTES, 320)
+    _play_pcm_chunks(
+        audio_data[offset:offset + chunk_size]
+        for offset in range(0, len(audio_data), chunk_size)
+    )
+
+
+def speak_sinhala_text(text: str, *, force: bool = False) -> bytes:
+    """Speak Sinhala text using Azure TTS with barge-in support
+
+    Playback starts with the first synthesized chunk instead of waiting for
+    the whole utterance. Returns the complete PCM (empty on failure or
+    barge-in) so callers can replay it.
+    """
+    if ((not enable_tts) and not force) or not speech_synthesizer or not text.strip():
+        return b""
+
+    try:
+        # Stop any active playback before starting a new utterance
+        stop_tts_event.set()
+
+        clean_text = normalize_sinhala_text(text)
+        if not clean_text:
+            return b""
+
+        ssml = _SSML_TEMPLATE.format(xml_escape(clean_text))
+
+        result = speech_synthesizer.start_speaking_ssml_async(ssml).get()
+        if result.reason != speechsdk.ResultReason.SynthesizingAudioStarted:
+            _log(f"❌ TTS දෝෂයක්: {result.reason}\n")
+            return b""
+
+        audio_stream = speechsdk.AudioDataStream(result)
 
     except Exception as e:
-        print(f"\r❌ කථන දෝෂයක්: {str(e)}")
+        _log(f"\r❌ කථන දෝෂයක්: {str(e)}\n")
+        return b""
+
+    received = []
+
+    def stream_chunks():
+        buffer = bytes(max(TTS_CHUNK_BYTES, 320))
+        while True:
+            filled = audio_stream.read_data(buffer)
+            if not filled:
+                return
+            # read_data overwrites buffer in place, and a full-length slice is
+            # buffer itself, so copy before keeping the chunk
+            chunk = bytes(memoryview(buffer)[:filled])
+            received.append(chunk)
+            yield chunk
+
+    if not _play_pcm_chunks(stream_chunks()):
+        try:
+            speech_synthesizer.stop_speaking_async()
+        except Exception:
+            pass
+        return b""
+
+    if audio_stream.status != speechsdk.StreamStatus.AllData:
+        _log(f"❌ TTS දෝෂයක්: {audio_stream.status}\n")
+        return b""
+
+    audio_data = b"".join(received)
+    if not audio_data:
+        _log("❌ TTS දෝෂයක්: හිස් ශ්‍රව්‍ය දත්ත\n")
+    return audio_data
 
 
 def main():
@@ -585,9 +865,7 @@ def main():
     args = parser.parse_args()
     
     if args.list_devices:
-        pa = pyaudio.PyAudio()
-        list_devices(pa)
-        pa.terminate()
+        list_devices(_get_pa())
         return
     
     # Get configuration from environment or command line
@@ -612,10 +890,14 @@ def main():
             channels=args.channels,
         )
     except KeyboardInterrupt:
+        _flush_log()
         print(f"\n\n{FAREWELL_DISPLAY}")
         speak_sinhala_text(FAREWELL_TTS, force=True)
     except Exception as e:
+        _flush_log()
         print(f"\n❌ දෝෂයක්: {str(e)}")
+    finally:
+        _flush_log()
 
 if __name__ == "__main__":
     main()
@@ -1,32 +1,96 @@
 import argparse
+import math
+import gc
 import os
-import queue
 import sys
 import threading
-import time
+from contextlib import contextmanager
 from typing import Iterable, Optional
 
+import numpy as np
 import pyaudio
 from google.cloud import speech_v1 as speech
+from google.cloud.speech_v1.services.speech.transports import SpeechGrpcTransport
+
+from resampling import StreamResampler
+from spsc_ring import SPSCRing
+
+# The capture ring holds about this much audio; on overrun the oldest chunks
+# are overwritten, since stale audio is worse than missing audio for live
+# recognition
+MAX_QUEUED_SECONDS = 0.5
+
+STT_SAMPLE_RATE = 16000  # faster capture is resampled down to this before sending
+
+# Input rates libopus accepts at or below STT_SAMPLE_RATE
+OPUS_RATES = (8000, 12000, 16000)
+
+# Every StreamingRecognizeRequest carries exactly this much audio
+REQUEST_SECONDS = 0.1
+
+# Prebuilt PortAudio callback result, so the callback does not build a tuple
+_CALLBACK_CONTINUE = (None, pyaudio.paContinue)
+
+# Channel args for one long-lived bidirectional stream on lossy VoIP links:
+# tight keepalives fail a dead connection in seconds instead of stalling the
+# request generator, and BDP probing grows the HTTP/2 window past 64 KiB
+GRPC_CHANNEL_OPTIONS = [
+    ("grpc.keepalive_time_ms", 10000),
+    ("grpc.keepalive_timeout_ms", 2000),
+    ("grpc.http2.min_time_between_pings_ms", 10000),
+    ("grpc.http2.max_pings_without_data", 0),
+    ("grpc.max_receive_message_length", 4 * 1024 * 1024),
+    ("grpc.http2.bdp_probe", 1),
+]
 
 
 def list_devices(pa: pyaudio.PyAudio) -> None:
     for i in range(pa.get_device_count()):
         info = pa.get_device_info_by_index(i)
-        if int(info.get("maxInputChannels", 0)) > 0:
-            print(f"[{i}] {info['name']} - {int(info['maxInputChannels'])} ch @ {int(info.get('defaultSampleRate', 0))} Hz")
+        channels = info["maxInputChannels"]
+        if channels > 0:
+            print(f"[{i}] {info['name']} - {channels} ch @ {info['defaultSampleRate']:.0f} Hz")
+
+
+def downmix_to_mono(data: bytes, channels: int) -> bytes:
+    """Average interleaved int16 frames across channels into mono int16 PCM"""
+    frames = np.frombuffer(data, dtype=np.int16).reshape(-1, channels)
+    return (frames.sum(axis=1, dtype=np.int32) // channels).astype(np.int16).tobytes()
 
 
 class MicrophoneStream:
-    def __init__(self, rate: int, chunk: int, device_index: Optional[int] = None, channels: int = 1):
+    """Microphone capture as a generator of 16-bit PCM chunks.
+
+    By default PortAudio delivers audio through a callback into an SPSCRing.
+    With ``blocking=True`` no Python code runs on the audio thread at all: the
+    consumer pulls each chunk with a blocking ``stream.read`` instead.
+    """
+
+    def __init__(
+        self,
+        rate: int,
+        chunk: int,
+        device_index: Optional[int] = None,
+        channels: int = 1,
+        blocking: bool = False,
+    ):
         self.rate = rate
         self.chunk = chunk
         self.channels = channels
         self.device_index = device_index
+        self.blocking = blocking
 
         self._audio_interface = pyaudio.PyAudio()
-        self._buff: "queue.Queue[bytes]" = queue.Queue()
+        self._buff = SPSCRing(
+            chunk * channels * 2,
+            slots=max(1, math.ceil(rate * MAX_QUEUED_SECONDS / chunk)),
+        )
+        self._push = self._buff.push
+        self._rfd = self._wfd = None
+        self._fd_lock = threading.Lock()  # __exit__ and the generator both close _rfd
         self._closed = True
+        # Held around each blocking read so __exit__ never closes a stream mid-read
+        self._read_lock = threading.Lock()
 
     def __enter__(self):
         stream_kwargs = dict(
@@ -35,43 +99,160 @@ class MicrophoneStream:
             rate=self.rate,
             input=True,
             frames_per_buffer=self.chunk,
-            stream_callback=self._fill_buffer,
         )
+        if not self.blocking:
+            stream_kwargs["stream_callback"] = self._fill_buffer
+            # A pipe rather than a condition variable wakes the consumer: the
+            # callback writes one byte per chunk and the consumer drains up to
+            # 64 of them per read, so a backlog costs one wake-up, not one each
+            self._rfd, self._wfd = os.pipe()
+            os.set_blocking(self._wfd, False)
         if self.device_index is not None:
             stream_kwargs["input_device_index"] = self.device_index
 
-        self._stream = self._audio_interface.open(**stream_kwargs)
+        try:
+            self._stream = self._audio_interface.open(**stream_kwargs)
+        except BaseException:
+            # __exit__ will not run, so release everything acquired so far
+            self._close_fd("_wfd")
+            self._close_fd("_rfd")
+            self._audio_interface.terminate()
+            raise
         self._closed = False
         return self
 
+    def _close_fd(self, name: str) -> None:
+        """Close the pipe end stored in attribute ``name`` at most once"""
+        with self._fd_lock:
+            fd = getattr(self, name)
+            setattr(self, name, None)
+        if fd is not None:
+            os.close(fd)
+
     def __exit__(self, exc_type, exc, traceback):
+        self._closed = True
         try:
-            self._stream.stop_stream()
-            self._stream.close()
+            with self._read_lock:
+                self._stream.stop_stream()
+                self._stream.close()
         finally:
-            self._closed = True
-            self._buff.put(None)
+            # The callback has stopped; closing the write end gives a waiting
+            # consumer EOF. The read end is closed here too, in case the
+            # generator was never started and so never closes it itself.
+            self._close_fd("_wfd")
+            self._close_fd("_rfd")
             self._audio_interface.terminate()
+            if self._buff.dropped:
+                print(f"\nDropped {self._buff.dropped} stale audio chunks", file=sys.stderr)
 
     def _fill_buffer(self, in_data, frame_count, time_info, status_flags):
-        self._buff.put(in_data)
-        return None, pyaudio.paContinue
+        # Runs on PortAudio's realtime thread: one slab copy, nothing allocated.
+        # A full ring overwrites its oldest chunk, so a stalled upload resumes
+        # with the freshest MAX_QUEUED_SECONDS of audio
+        self._push(in_data)
+        try:
+            os.write(self._wfd, b"\x01")
+        except BlockingIOError:
+            pass  # pipe full: the consumer already has wake-ups pending
+        return _CALLBACK_CONTINUE
 
-    def generator(self) -> Iterable[bytes]:
-        while not self._closed:
-            chunk = self._buff.get()
-            if chunk is None:
-                return
-            data = [chunk]
+    def _blocking_generator(self) -> Iterable[bytes]:
+        while True:
+            with self._read_lock:
+                if self._closed:
+                    return
+                data = self._stream.read(self.chunk, exception_on_overflow=False)
+            yield data
+
+    def _callback_generator(self) -> Iterable[bytes]:
+        # Bound once: this loop runs for every chunk of the session
+        buff = self._buff
+        read = os.read
+        rfd = self._rfd
+        try:
             while True:
-                try:
-                    chunk = self._buff.get(block=False)
-                    if chunk is None:
-                        return
-                    data.append(chunk)
-                except queue.Empty:
-                    break
-            yield b"".join(data)
+                if not len(buff):
+                    try:
+                        if not read(rfd, 64):
+                            return  # write end closed by __exit__
+                    except OSError:
+                        return  # read end already closed by __exit__
+                    continue
+                yield buff.pop()
+        finally:
+            self._close_fd("_rfd")
+
+    def generator(self) -> Iterable[bytes]:
+        """Yield audio in fixed REQUEST_SECONDS requests, carrying any remainder"""
+        request_bytes = int(self.rate * REQUEST_SECONDS) * self.channels * 2
+        source = self._blocking_generator() if self.blocking else self._callback_generator()
+        pending = bytearray()
+        for data in source:
+            pending += data
+            while len(pending) >= request_bytes:
+                with memoryview(pending) as view:
+                    request = bytes(view[:request_bytes])
+                del pending[:request_bytes]
+                yield request
+
+
+def _pin_to_cpu(cpu: int) -> None:
+    """Pin this thread (and threads it starts later) to one CPU and raise priority
+
+    Best effort: affinity is Linux-only and a negative nice value needs
+    privileges, so failures are reported and otherwise ignored.
+    """
+    if hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, {cpu})
+        except OSError as err:
+            print(f"WARNING: could not pin to CPU {cpu}: {err}", file=sys.stderr)
+    else:
+        print("WARNING: CPU pinning is not supported on this platform", file=sys.stderr)
+    try:
+        os.nice(-5)
+    except OSError as err:
+        print(f"WARNING: could not raise process priority: {err}", file=sys.stderr)
+
+
+@contextmanager
+def _gc_paused():
+    """Keep cyclic GC pauses off the audio path for the duration of a session
+
+    Everything allocated during setup is collected and frozen first, so the
+    steady-state streaming loop, which allocates few long-lived objects,
+    runs with the collector disabled.
+    """
+    gc.collect()
+    gc.freeze()
+    gc.disable()
+    try:
+        yield
+    finally:
+        gc.enable()
+        gc.unfreeze()
+
+
+def _audio_requests(audio_generator: Iterable[bytes]) -> Iterable[speech.StreamingRecognizeRequest]:
+    """Wrap audio chunks in one reused StreamingRecognizeRequest
+
+    gRPC serializes each request before pulling the next one from the
+    iterator, so refilling the same message is safe and saves building a new
+    protobuf message for every chunk.
+    """
+    request = speech.StreamingRecognizeRequest()
+    for content in audio_generator:
+        request.audio_content = content
+        yield request
+
+
+def _speech_client() -> speech.SpeechClient:
+    """SpeechClient on a gRPC channel built with GRPC_CHANNEL_OPTIONS"""
+    channel = SpeechGrpcTransport.create_channel(
+        "speech.googleapis.com:443",
+        options=GRPC_CHANNEL_OPTIONS,
+    )
+    return speech.SpeechClient(transport=SpeechGrpcTransport(channel=channel))
 
 
 def stream_transcribe(
@@ -82,16 +263,36 @@ def stream_transcribe(
     alt_langs: Optional[list[str]] = None,
     enable_punctuation: bool = True,
     interim: bool = True,
+    blocking: bool = False,
+    downmix: bool = False,
+    cpu: Optional[int] = None,
+    opus: bool = False,
 ):
-    client = speech.SpeechClient()
+    # Pin before the gRPC and PortAudio threads exist so they inherit it
+    if cpu is not None:
+        _pin_to_cpu(cpu)
+
+    # The Opus path encodes mono, so multichannel input is always downmixed
+    downmix = (downmix or opus) and channels > 1
+    stt_channels = 1 if downmix else channels
+    # Never upsample: that only adds bytes. Opus must still get a rate it
+    # supports, so other slow rates go up to 16 kHz in that mode.
+    stt_rate = min(rate, STT_SAMPLE_RATE)
+    if opus and stt_rate not in OPUS_RATES:
+        stt_rate = STT_SAMPLE_RATE
+    client = _speech_client()
 
     config = speech.RecognitionConfig(
-        encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
-        sample_rate_hertz=rate,
+        encoding=(
+            speech.RecognitionConfig.AudioEncoding.OGG_OPUS
+            if opus
+            else speech.RecognitionConfig.AudioEncoding.LINEAR16
+        ),
+        sample_rate_hertz=stt_rate,
         language_code=language_code,
         alternative_language_codes=(alt_langs or []),
         enable_automatic_punctuation=enable_punctuation,
-        audio_channel_count=channels,
+        audio_channel_count=stt_channels,
         model="default",
     )
 
@@ -101,18 +302,48 @@ def stream_transcribe(
         single_utterance=False,
     )
 
-    chunk = int(rate / 10)  # ~100ms
-    with MicrophoneStream(rate, chunk, device_index=device_index, channels=channels) as mic:
+    # Largest power of two not above ~100ms (4096 at 44.1 and 48 kHz) so
+    # the buffer lines up with typical device periods; generator() re-chunks
+    # to REQUEST_SECONDS regardless
+    chunk = 1 << (int(rate / 10).bit_length() - 1)
+    mic_stream = MicrophoneStream(rate, chunk, device_index=device_index, channels=channels, blocking=blocking)
+    with _gc_paused(), mic_stream as mic:
         audio_generator = mic.generator()
+        if downmix:
+            audio_generator = (downmix_to_mono(data, channels) for data in audio_generator)
+        if rate != stt_rate:
+            # Google's models run at 16 kHz; higher capture rates only add bytes
+            resampler = StreamResampler(rate, stt_rate, stt_channels)
+            audio_generator = (
+                resampled
+                for resampled in map(resampler.process, audio_generator)
+                if resampled
+            )
+        if opus:
+            # ~24 kbps Ogg Opus instead of 256 kbps LINEAR16 at 16 kHz mono
+            from ogg_opus import OggOpusEncoder
 
-        requests = (
-            speech.StreamingRecognizeRequest(audio_content=content)
-            for content in audio_generator
-        )
+            encoder = OggOpusEncoder(stt_rate, stt_channels)
+            audio_generator = (
+                encoded
+                for encoded in map(encoder.encode, audio_generator)
+                if encoded
+            )
 
+        requests = _audio_requests(audio_generator)
+
+        # gRPC drains `requests` on its own thread, so audio upload already runs
+        # concurrently with this thread reading and printing responses
         responses = client.streaming_recognize(streaming_config, requests)
 
-        print("Listening… Press Ctrl+C to stop.\n")
+        print("Listening… Press Ctrl+C to stop.\n", flush=True)
+        # Transcripts go straight to the fd: one write(2) per response instead of
+        # the sys.stdout lock/encode/flush stack, which dominated at interim rates
+        out_fd = sys.stdout.fileno()
+        # Blank out leftovers of a longer previous line, then step back so the
+        # cursor sits right after the transcript
+        pad = b" " * 10 + b"\b" * 10
+        last = ""  # interim transcript currently on screen
         try:
             for response in responses:
                 if not response.results:
@@ -122,11 +353,19 @@ def stream_transcribe(
                     continue
                 transcript = result.alternatives[0].transcript
                 if result.is_final:
-                    print(transcript)
+                    os.write(out_fd, b"\r" + transcript.encode("utf-8") + pad + b"\n")
+                    last = ""
+                elif transcript == last:
+                    continue
+                elif last and transcript.startswith(last):
+                    # Interim grew: append only the new tail
+                    os.write(out_fd, transcript[len(last):].encode("utf-8"))
+                    last = transcript
                 else:
-                    # Overwrite line for interim results
-                    sys.stdout.write("\r" + transcript + " " * 10)
-                    sys.stdout.flush()
+                    # Interim was revised: repaint the line. Backspacing over the
+                    # old tail is unreliable with combining and wide characters
+                    os.write(out_fd, b"\r" + transcript.encode("utf-8") + pad)
+                    last = transcript
         except KeyboardInterrupt:
             print("\nStopping…")
 
@@ -147,6 +386,27 @@ def main():
         default=None,
         help="Input device index (see list_devices.py)",
     )
+    parser.add_argument(
+        "--blocking",
+        action="store_true",
+        help="Read the mic with blocking reads instead of a PortAudio callback",
+    )
+    parser.add_argument(
+        "--downmix",
+        action="store_true",
+        help="Average multichannel input to mono before sending it to Google",
+    )
+    parser.add_argument(
+        "--cpu",
+        type=int,
+        default=None,
+        help="Pin audio/gRPC threads to this CPU and raise their priority (Linux)",
+    )
+    parser.add_argument(
+        "--opus",
+        action="store_true",
+        help="Send Ogg Opus instead of raw PCM to cut bandwidth (needs opuslib + libopus)",
+    )
     args = parser.parse_args()
 
     creds = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
@@ -163,6 +423,10 @@ def main():
         device_index=args.device,
         channels=args.channels,
         alt_langs=alt_langs,
+        blocking=args.blocking,
+        downmix=args.downmix,
+        cpu=args.cpu,
+        opus=args.opus,
     )
 
 
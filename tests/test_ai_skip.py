@@ -0,0 +1,72 @@
+import importlib
+import importlib.util
+import os
+import sys
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+_DEPENDENCIES = ("azure.cognitiveservices.speech", "pyaudio", "openai", "scipy")
+
+
+def _missing_dependencies():
+    missing = []
+    for name in _DEPENDENCIES:
+        try:
+            if importlib.util.find_spec(name) is None:
+                missing.append(name)
+        except ModuleNotFoundError:
+            missing.append(name)
+    return missing
+
+
+@unittest.skipIf(_missing_dependencies(), f"needs {', '.join(_DEPENDENCIES)}")
+class ShouldSkipAiTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Empty keys win over .env, so importing the module makes no
+        # OpenAI or Azure calls
+        with mock.patch.dict(os.environ, {"OPENAI_API_KEY": "", "AZURE_SPEECH_KEY": ""}):
+            cls.stt = importlib.import_module("stream_azure_stt")
+
+    def setUp(self):
+        self.stt._response_cache.clear()
+        patches = [
+            mock.patch.object(self.stt, "enable_ai_responses", True),
+            mock.patch.object(self.stt, "enable_tts", False),
+            mock.patch.object(self.stt, "get_sinhala_response", return_value=""),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _recognize(self, text: str) -> None:
+        result = SimpleNamespace(
+            reason=self.stt.speechsdk.ResultReason.RecognizedSpeech,
+            text=text,
+            language=None,
+        )
+        self.stt.on_recognized(SimpleNamespace(result=result), show_lang=False)
+
+    def test_filler_does_not_reach_openai(self):
+        for text in ("ok", "OK!", "ඔව්, ඔව්."):
+            self._recognize(text)
+        self.stt.get_sinhala_response.assert_not_called()
+
+    def test_two_token_utterance_reaches_openai(self):
+        self._recognize("ණය පොලිය")
+        self.stt.get_sinhala_response.assert_called_once_with("ණය පොලිය")
+
+    def test_cached_filler_is_still_skipped(self):
+        self.stt._response_cache_put("ok", "cached reply", b"")
+        with mock.patch.object(self.stt, "_log") as log:
+            self._recognize("ok")
+        self.assertNotIn(mock.call("🤖 cached reply\n"), log.call_args_list)
+        self.stt.get_sinhala_response.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from spsc_ring import SPSCRing  # noqa: E402
+
+
+def _chunk(n: int) -> bytes:
+    return bytes([n]) * 4
+
+
+class SPSCRingTest(unittest.TestCase):
+    def test_pop_returns_queued_chunks_in_order(self):
+        ring = SPSCRing(4, slots=8)
+        for n in range(3):
+            ring.push(_chunk(n))
+        self.assertEqual(len(ring), 3)
+        self.assertEqual(ring.pop(), _chunk(0) + _chunk(1) + _chunk(2))
+        self.assertEqual(len(ring), 0)
+        self.assertEqual(ring.pop(), b"")
+
+    def test_pop_across_wraparound(self):
+        ring = SPSCRing(4, slots=4)
+        for n in range(3):
+            ring.push(_chunk(n))
+        ring.pop()
+        for n in range(3, 6):
+            ring.push(_chunk(n))
+        self.assertEqual(ring.pop(), b"".join(_chunk(n) for n in range(3, 6)))
+        self.assertEqual(ring.dropped, 0)
+
+    def test_overrun_keeps_newest_chunks(self):
+        ring = SPSCRing(4, slots=5)
+        for n in range(40):
+            ring.push(_chunk(n))
+        self.assertEqual(len(ring), 5)
+        self.assertEqual(ring.pop(), b"".join(_chunk(n) for n in range(35, 40)))
+        self.assertEqual(ring.dropped, 35)
+
+        # Capture continues seamlessly after the overrun
+        ring.push(_chunk(40))
+        self.assertEqual(ring.pop(), _chunk(40))
+
+    def test_short_chunks_are_packed(self):
+        ring = SPSCRing(4, slots=4)
+        ring.push(b"ab")
+        ring.push(b"cdef")
+        self.assertEqual(ring.pop(), b"abcdef")
+
+    def test_oversized_chunk_is_dropped(self):
+        ring = SPSCRing(4, slots=4)
+        ring.push(b"too long")
+        self.assertEqual(len(ring), 0)
+        self.assertEqual(ring.dropped, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()